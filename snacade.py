@@ -1,5 +1,7 @@
 import traceback
 import logging
+import math
+import time
 from uuid import uuid4
 from pathlib import Path
 from queue import Queue
@@ -14,26 +16,88 @@ from .appdirs import appdirs
 
 from .src.game import Game
 from .src.ui import GameUI, InputIds
+from .src.profiling import HandlerProfiler
+from .src.accounting import OperationStats, InstrumentedWorld, InstrumentedRunBodies
+from .src.render import SnakeRuns, FusionRunBodies, MazeCache, scale_bodies
+from .src.spectator import SpectatorPublisher
 
 ### GLOBALS (Settings) ###
 LOGGING_ENABLED = False
+PROFILING_ENABLED = False
+PROFILES_PATH = str(Path(appdirs.user_state_dir("snacade")) / "profiles")
+ACCOUNTING_ENABLED = False
+OPERATIONS_PATH = str(Path(appdirs.user_state_dir("snacade")) / "operations")
+# streams the game frames to external viewers (see src/spectator.py)
+SPECTATOR_ENABLED = False
+SPECTATOR_ADDRESS = ("127.0.0.1", 47474)
 
 N_SCORES_DISPLAYED = 5
 SCORES_PATH = str(Path(appdirs.user_state_dir("snacade")) / "highscores.json")
 N_SPEED_LEVELS = 5
 INITIAL_SPEED_LEVEL = 2
 INITIAL_BLOCK_SIZE = 10
+# "spheres": one sphere per body segment, "merged": straight parts of long snakes
+# are merged into single bodies
+# merged keeps the number of bodies in the design low but costs more per tick:
+# up to 7 body operations instead of 3 and the run at the tail end is rebuilt
+# with two boolean unions of temporary breps on every move
+SNAKE_RENDER_MODE = "spheres"
+WORLD_OFFSET = (1.5, 1.5)
+# maximum number of maze voxels which are kept in hidden components
+MAZE_CACHE_MAX_VOXELS = 10000
 NO_SCORE_SYMBOL = "-"
 RESOURCE_FOLDER = Path(__file__).parent / "resources"
 
 MIN_MOVE_WAIT_TIME = 0.1
 MAX_MOVE_WAIT_TIME = 0.5
 
+# in turbo mode the snake moves with a fixed timestep (between the turbo wait times
+# depending on the speed level) while fusion only renders every RENDER_INTERVAL
+TURBO_MODE = False
+TURBO_MIN_MOVE_WAIT_TIME = 0.02
+TURBO_MAX_MOVE_WAIT_TIME = 0.1
+RENDER_INTERVAL = 0.2
+MAX_STEPS_PER_FRAME = 25
+
 SCREEN_OFFSETS = {"left": 3, "right": 1, "top": 4, "botton": 3}
 HORZIONTAL_SCALING = 1.2  # to provent overlapping of commadn inputs
+# volumetric worlds are viewed from the lower right front so the layers are shifted
+# against each other on the screen
+ANGLED_VIEW_DIRECTION = (0.5, -0.5, 1)
+
+
+def _set_angled_camera(height, width, depth, grid_size):
+    borders = [
+        (
+            -SCREEN_OFFSETS["left"],
+            (width + SCREEN_OFFSETS["right"]) * HORZIONTAL_SCALING,
+        ),
+        (-SCREEN_OFFSETS["botton"], height + SCREEN_OFFSETS["top"]),
+        (-1, depth + 1),
+    ]
+    center = [(low + high) / 2 * grid_size for low, high in borders]
+    radius = math.sqrt(
+        sum(((high - low) / 2 * grid_size) ** 2 for low, high in borders)
+    )
+
+    viewport = adsk.core.Application.get().activeViewport
+    camera = viewport.camera
+    camera.cameraType = adsk.core.CameraTypes.OrthographicCameraType
+    camera.isSmoothTransition = False
+    camera.target = adsk.core.Point3D.create(*center)
+    camera.eye = adsk.core.Point3D.create(
+        *(c + d * 2 * radius for c, d in zip(center, ANGLED_VIEW_DIRECTION))
+    )
+    # the up key still moves the snake upwards on the screen
+    camera.upVector = adsk.core.Vector3D.create(0, 1, 0)
+    camera.viewExtents = radius
+    viewport.camera = camera
 
 
-def _set_camera(height, width, grid_size, plane):
+def _set_camera(height, width, depth, grid_size, plane):
+    if depth > 1:
+        _set_angled_camera(height, width, depth, grid_size)
+        return
     faf.utils.set_camera(
         plane=plane,
         horizontal_borders=(
@@ -47,6 +111,15 @@ def _set_camera(height, width, grid_size, plane):
     )
 
 
+def _rescale_world(new_grid_size):
+    # scale the existing bodies instead of deleting and recreating all of them
+    if new_grid_size == game.world.grid_size:
+        return
+    scale_bodies(comp, new_grid_size / game.world.grid_size)
+    maze_cache.rescale(new_grid_size)
+    game.world.grid_size = new_grid_size
+
+
 ### INTER HANDLER SHARED VARIABLES ###
 # varibale which are created in an event handler and need to be accessed from
 # different event handler(s) as well
@@ -54,11 +127,18 @@ addin = None
 game = None
 command = None
 comp = None
+maze_cache = None
 mover_event_id = None
+profiler = None
+spectator = None
 execution_queue = Queue()
 
 
 def on_created(event_args: adsk.core.CommandCreatedEventArgs):
+    # the sampler only runs while the game command is active
+    if profiler is not None:
+        profiler.start()
+
     global command
     command = event_args.command
 
@@ -94,13 +174,48 @@ def on_created(event_args: adsk.core.CommandCreatedEventArgs):
     global comp
     comp = faf.utils.new_comp("Snacade")
     design.rootComponent.allOccurrencesByComponent(comp).item(0).activate()
-    world = vox.VoxelWorld(game_ui.block_size_input.value, comp, offset=(1.5, 1.5))
+    world = vox.VoxelWorld(game_ui.block_size_input.value, comp, offset=WORLD_OFFSET)
+    run_bodies = FusionRunBodies(comp, world, WORLD_OFFSET, Game.snake_body_voxel_style)
+    create_maze_world = partial(vox.VoxelWorld, offset=WORLD_OFFSET)
+    if ACCOUNTING_ENABLED:
+        stats = OperationStats()
+        world = InstrumentedWorld(world, stats)
+        run_bodies = InstrumentedRunBodies(run_bodies, stats)
+        create_maze_world = lambda grid_size, component: InstrumentedWorld(
+            vox.VoxelWorld(grid_size, component, offset=WORLD_OFFSET), stats
+        )
+    snake_runs = SnakeRuns(run_bodies) if SNAKE_RENDER_MODE == "merged" else None
+    global maze_cache
+    maze_cache = MazeCache(comp, create_maze_world, MAZE_CACHE_MAX_VOXELS)
 
     global game
-    game = Game(world, game_ui, mover_event_id, MIN_MOVE_WAIT_TIME, MAX_MOVE_WAIT_TIME)
+    if TURBO_MODE:
+        game = Game(
+            world,
+            game_ui,
+            mover_event_id,
+            TURBO_MIN_MOVE_WAIT_TIME,
+            TURBO_MAX_MOVE_WAIT_TIME,
+            snake_runs=snake_runs,
+            maze_cache=maze_cache,
+            spectator=spectator,
+            render_interval=RENDER_INTERVAL,
+            max_steps_per_frame=MAX_STEPS_PER_FRAME,
+        )
+    else:
+        game = Game(
+            world,
+            game_ui,
+            mover_event_id,
+            MIN_MOVE_WAIT_TIME,
+            MAX_MOVE_WAIT_TIME,
+            snake_runs=snake_runs,
+            maze_cache=maze_cache,
+            spectator=spectator,
+        )
 
     # set the camera
-    _set_camera(game.height, game.width, game.world.grid_size, game.plane)
+    _set_camera(game.height, game.width, game.depth, game.world.grid_size, game.plane)
 
     # does not work because command hasnt been created yet
     # event_args.command.doExecute(False)
@@ -111,6 +226,8 @@ def on_created(event_args: adsk.core.CommandCreatedEventArgs):
 def on_execute(event_args: adsk.core.CommandEventArgs):
     while not execution_queue.empty():
         execution_queue.get()()
+    if ACCOUNTING_ENABLED:
+        game.world.stats.end_frame()
 
 
 def on_input_changed(event_args: adsk.core.InputChangedEventArgs):
@@ -130,10 +247,14 @@ def on_input_changed(event_args: adsk.core.InputChangedEventArgs):
 
     if event_args.input.id == InputIds.BlockSize.value:
         if event_args.input.isValidExpression and event_args.input.value > 0.0:
-            execution_queue.put(game.world.clear)
-            game.world.grid_size = event_args.input.value
-            _set_camera(game.height, game.width, game.world.grid_size, game.plane)
-            execution_queue.put(partial(game.update_world, use_progress_dialog=True))
+            execution_queue.put(partial(_rescale_world, event_args.input.value))
+            _set_camera(
+                game.height,
+                game.width,
+                game.depth,
+                event_args.input.value,
+                game.plane,
+            )
 
     if event_args.input.id == InputIds.SpeedSlider.value:
         game.speed = event_args.input.valueOne
@@ -141,6 +262,10 @@ def on_input_changed(event_args: adsk.core.InputChangedEventArgs):
     if event_args.input.id == InputIds.MazeDropdown.value:
         game.build_start_state()
         execution_queue.put(partial(game.update_world, use_progress_dialog=True))
+        # the worlds differ in size and dimensionality
+        _set_camera(
+            game.height, game.width, game.depth, game.world.grid_size, game.plane
+        )
 
     command.doExecute(False)
 
@@ -151,6 +276,8 @@ def on_key_down(event_args: adsk.core.KeyboardEventArgs):
         adsk.core.KeyCodes.LeftKeyCode: game.left,
         adsk.core.KeyCodes.RightKeyCode: game.right,
         adsk.core.KeyCodes.DownKeyCode: game.down,
+        adsk.core.KeyCodes.PageUpKeyCode: game.forward,
+        adsk.core.KeyCodes.PageDownKeyCode: game.backward,
     }.get(event_args.keyCode, lambda: None)()
 
     execution_queue.put(game.update_world)
@@ -161,16 +288,25 @@ def on_destroy(event_args: adsk.core.CommandEventArgs):
     game.pause()
     game.stop()
 
+    if ACCOUNTING_ENABLED:
+        game.world.stats.dump(
+            Path(OPERATIONS_PATH) / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+
     if not event_args.command.commandInputs.itemById(InputIds.KeepBodies.value).value:
         # game.world.clear()
         faf.utils.delete_comp(comp)
+    else:
+        maze_cache.discard_hidden()
 
 
 def on_periodic_move(event_args: adsk.core.CustomEventArgs):
-    game.move_snake()
+    # one step or all steps which are due since the last frame in turbo mode
+    game.advance()
     # game.update_world() # --> somehow ont working --> therfore:
     # command cant be retrieved from args --> global instance necessary
     if command.isValid:
+        # renders the latest frame published by the game, not the live state
         execution_queue.put(game.update_world)
         command.doExecute(False)
     # results in fusion work --> must be executed from custom event handler
@@ -197,16 +333,47 @@ def run(context):
         control = faf.Control(panel)
         global mover_event_id
         mover_event_id = str(uuid4())
+
+        handlers = {
+            "commandCreated": on_created,
+            "inputChanged": on_input_changed,
+            "keyDown": on_key_down,
+            "execute": on_execute,
+            "destroy": on_destroy,
+        }
+        periodic_move_handler = on_periodic_move
+        if PROFILING_ENABLED:
+            global profiler
+            profiler = HandlerProfiler()
+            handlers = {
+                event_name: profiler.wrap(
+                    handler,
+                    dump_folder=PROFILES_PATH if event_name == "destroy" else None,
+                )
+                for event_name, handler in handlers.items()
+            }
+            periodic_move_handler = profiler.wrap(on_periodic_move)
+
+        if SPECTATOR_ENABLED:
+            global spectator
+            spectator = SpectatorPublisher(SPECTATOR_ADDRESS)
+            try:
+                spectator.start()
+            except OSError:
+                # e.g. the port is used by another fusion instance, the game
+                # is still playable without spectators
+                logging.getLogger(__name__).exception(
+                    "Could not start the spectator stream on %s:%s.",
+                    *SPECTATOR_ADDRESS,
+                )
+                spectator = None
+
         cmd = faf.AddinCommand(
             control,
             resourceFolder=str(RESOURCE_FOLDER / "snake_icon"),
             name="Snacade",
-            commandCreated=on_created,
-            inputChanged=on_input_changed,
-            keyDown=on_key_down,
-            execute=on_execute,
-            destroy=on_destroy,
-            customEventHandlers={mover_event_id: on_periodic_move},
+            customEventHandlers={mover_event_id: periodic_move_handler},
+            **handlers,
         )
 
     except:
@@ -222,6 +389,10 @@ def stop(context):
         app = adsk.core.Application.get()
         ui = app.userInterface
         addin.stop()
+        if profiler is not None:
+            profiler.stop()
+        if spectator is not None:
+            spectator.stop()
     except:
         msg = "Failed:\n{}".format(traceback.format_exc())
         if ui:
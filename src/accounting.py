@@ -0,0 +1,135 @@
+import time
+import json
+from pathlib import Path
+from collections import Counter
+
+
+# operations which result in fusion api calls on brep bodies
+BODY_OPERATIONS = ("create", "delete", "restyle", "rescale")
+
+
+class OperationStats:
+    def __init__(self):
+        self.frames = []
+        self._counts = Counter()
+        self._times = Counter()
+
+    def count(self, operation, n=1):
+        self._counts[operation] += n
+
+    def add_time(self, method_name, duration):
+        self._times[method_name] += duration
+
+    def end_frame(self):
+        self.frames.append(
+            {"operations": dict(self._counts), "times": dict(self._times)}
+        )
+        self._counts = Counter()
+        self._times = Counter()
+
+    @staticmethod
+    def body_operations(frame):
+        return sum(frame["operations"].get(op, 0) for op in BODY_OPERATIONS)
+
+    def totals(self):
+        counts = Counter()
+        times = Counter()
+        for frame in self.frames:
+            counts.update(frame["operations"])
+            times.update(frame["times"])
+        return dict(counts), dict(times)
+
+    def dump(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.frames, f, indent=4)
+
+
+class InstrumentedWorld:
+    # wraps a (real or stand-in) VoxelWorld, times every call and derives the
+    # brep body operations which are caused by the call from a shadow copy of
+    # the voxel styles
+
+    def __init__(self, world, stats):
+        self._world = world
+        self._stats = stats
+        self._voxels = {}
+
+    def _style_operations(self, old_style, new_style):
+        if old_style is None and new_style is None:
+            return
+        if old_style is None:
+            self._stats.count("create")
+        elif new_style is None:
+            self._stats.count("delete")
+        elif old_style["voxel_class"] != new_style["voxel_class"]:
+            self._stats.count("delete")
+            self._stats.count("create")
+        elif old_style != new_style:
+            self._stats.count("restyle")
+
+    def _timed(self, method_name, *args, **kwargs):
+        self._stats.count(method_name)
+        start = time.perf_counter()
+        result = getattr(self._world, method_name)(*args, **kwargs)
+        self._stats.add_time(method_name, time.perf_counter() - start)
+        return result
+
+    def update(self, voxels, *args, **kwargs):
+        for coord in self._voxels.keys() - voxels.keys():
+            self._style_operations(self._voxels[coord], None)
+        for coord, style in voxels.items():
+            self._style_operations(self._voxels.get(coord), style)
+        self._voxels = dict(voxels)
+        return self._timed("update", voxels, *args, **kwargs)
+
+    def add_voxel(self, coord, **style):
+        self._style_operations(self._voxels.get(coord), style)
+        self._voxels[coord] = style
+        return self._timed("add_voxel", coord, **style)
+
+    def remove_voxel(self, coord):
+        self._style_operations(self._voxels.pop(coord, None), None)
+        return self._timed("remove_voxel", coord)
+
+    def clear(self):
+        self._stats.count("delete", len(self._voxels))
+        self._voxels = {}
+        return self._timed("clear")
+
+    @property
+    def stats(self):
+        return self._stats
+
+    @property
+    def grid_size(self):
+        return self._world.grid_size
+
+    @grid_size.setter
+    def grid_size(self, new_grid_size):
+        # the bodies are rescaled by a single scale feature (see scale_bodies)
+        if new_grid_size != self._world.grid_size and self._voxels:
+            self._stats.count("rescale")
+        self._world.grid_size = new_grid_size
+
+
+class InstrumentedRunBodies:
+    # counts and times the bodies created for the runs of the merged snake body
+    def __init__(self, run_bodies, stats):
+        self._run_bodies = run_bodies
+        self._stats = stats
+
+    def add(self, first_cell, last_cell):
+        self._stats.count("create")
+        self._stats.count("add_run")
+        start = time.perf_counter()
+        handle = self._run_bodies.add(first_cell, last_cell)
+        self._stats.add_time("add_run", time.perf_counter() - start)
+        return handle
+
+    def remove(self, handle):
+        self._stats.count("delete")
+        self._stats.count("remove_run")
+        start = time.perf_counter()
+        self._run_bodies.remove(handle)
+        self._stats.add_time("remove_run", time.perf_counter() - start)
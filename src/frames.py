@@ -0,0 +1,37 @@
+from collections import namedtuple
+
+# this module does not import the fusion api so the frames can also be used
+# outside of fusion (e.g. by spectators of the game)
+
+# immutable snapshot of the game which is published after every tick, the
+# renderer only reads published frames so it never sees a half updated snake
+# while the next tick is computed on the live game state
+Frame = namedtuple(
+    "Frame",
+    ["epoch", "moves", "snake", "food", "score", "state", "maze", "portal", "shape"],
+)
+
+
+def frame_changes(old_frame, new_frame):
+    # returns {cell: "head" | "body" | "food" | None} for all cells whose content
+    # changed between the frames or None if the frames are not related
+    if old_frame is None or old_frame.epoch != new_frame.epoch:
+        return None
+
+    n_moves = new_frame.moves - old_frame.moves
+    if n_moves < 0:
+        return None
+
+    # the new snake consists of the n_moves new cells followed by the front part
+    # of the old snake, everything behind this part has been freed
+    n_kept = max(len(new_frame.snake) - n_moves, 0)
+    changes = {cell: None for cell in old_frame.snake[n_kept:]}
+    if old_frame.food != new_frame.food:
+        changes[old_frame.food] = None
+        changes[new_frame.food] = "food"
+    for cell in new_frame.snake[1:n_moves]:
+        changes[cell] = "body"
+    if n_moves > 0 and n_kept > 0:
+        changes[old_frame.snake[0]] = "body"
+    changes[new_frame.snake[0]] = "head"
+    return changes
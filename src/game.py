@@ -1,20 +1,40 @@
 import random
+import time
+from collections import deque
+from functools import partial
 
 import adsk.core, adsk.fusion, adsk.cam
 
 from ..voxler import voxler as vox
 from ..fusion_addin_framework import fusion_addin_framework as faf
 
+from .frames import Frame, frame_changes
+
 
 class Snake:
-    _allowed_moves = ["left", "right", "up", "down"]
+    _moves = {
+        "left": (-1, 0, 0),
+        "right": (1, 0, 0),
+        "up": (0, 1, 0),
+        "down": (0, -1, 0),
+        "forward": (0, 0, 1),
+        "backward": (0, 0, -1),
+    }
+
+    def __init__(self, head, orientation, body_length, portals=None, volumetric=False):
+        self._allowed_moves = list(self._moves.keys())
+        if not volumetric:
+            self._allowed_moves = self._allowed_moves[:4]
 
-    def __init__(self, head, orientation, body_length, portals=None):
         self._current_direction = orientation
-        self._elements = [head] + [
-            self._move_coordinate(head, self._current_direction, -i)
-            for i in range(1, body_length)
-        ]
+        # deque to avoid shifting the whole snake on every move
+        self._elements = deque(
+            [head]
+            + [
+                self._move_coordinate(head, self._current_direction, -i)
+                for i in range(1, body_length)
+            ]
+        )
 
         self._last_tail = None
         self._direction_setable = True
@@ -25,14 +45,9 @@ class Snake:
         if direction not in self._allowed_moves:
             raise ValueError()
 
-        x_dir, y_dir = {
-            "left": (-1, 0),
-            "right": (1, 0),
-            "up": (0, 1),
-            "down": (0, -1),
-        }[direction]
+        x_dir, y_dir, z_dir = self._moves[direction]
 
-        return (coord[0] + x_dir * i, coord[1] + y_dir * i)
+        return (coord[0] + x_dir * i, coord[1] + y_dir * i, coord[2] + z_dir * i)
 
     def eat(self):
         if self._last_tail is None:
@@ -41,16 +56,22 @@ class Snake:
         self._last_tail = None
         return self._elements[-1]
 
-    def move(self):
-        new_head = self._move_coordinate(self._elements[0], self._current_direction)
+    def next_head(self, direction):
+        new_head = self._move_coordinate(self._elements[0], direction)
         if self._portals is not None:
-            new_head = (new_head[0] % self._portals[0], new_head[1] % self._portals[1])
-        self._elements.insert(0, new_head)
+            new_head = tuple(c % p for c, p in zip(new_head, self._portals))
+        return new_head
+
+    def move(self):
+        new_head = self.next_head(self._current_direction)
+        self._elements.appendleft(new_head)
         self._last_tail = self._elements.pop()
         self._direction_setable = True
+        return self._last_tail
 
     def undo_move(self):
-        self._elements = self._elements[1:] + [self._last_tail]
+        self._elements.popleft()
+        self._elements.append(self._last_tail)
         self._last_tail = None
 
     def set_direction(self, new_direction):
@@ -62,6 +83,8 @@ class Snake:
                 ("down", "up"),
                 ("left", "right"),
                 ("right", "left"),
+                ("forward", "backward"),
+                ("backward", "forward"),
             ]:
                 self._current_direction = new_direction
                 self._direction_setable = False
@@ -70,9 +93,243 @@ class Snake:
     def head(self):
         return self._elements[0]
 
+    @property
+    def direction(self):
+        return self._current_direction
+
+    @property
+    def elements(self):
+        return tuple(self._elements)
+
+    @property
+    def allowed_moves(self):
+        return self._allowed_moves
+
     @property
     def body(self):
-        return self._elements[1:]
+        return list(self._elements)[1:]
+
+
+class ReachabilityIndex:
+    # keeps track of the connected regions of free cells with a union find
+    # structure over the flattened cell indices
+    # freeing a cell only unions it with its free neighbours, occupying a cell
+    # might split its region, therfore the region is only marked as dirty and
+    # recomputed (only this region) when its needed the next time
+
+    def __init__(self, shape, blocked, portals=False):
+        self._shape = shape
+        self._portals = portals
+        n_cells = 1
+        for size in shape:
+            n_cells *= size
+
+        self._parent = list(range(n_cells))
+        # root -> list of the free cells in the region
+        self._members = {}
+        # cell -> position in the members list of its region, -1 if not free
+        self._positions = [-1] * n_cells
+        # root -> occupied cells of a dirty region which are still part of the
+        # union find tree and are reset when the region is rebuilt
+        self._ghosts = {}
+        self._dirty = set()
+
+        blocked = {self._index(c) for c in blocked if self._in_bounds(c)}
+        self._flood([i for i in range(n_cells) if i not in blocked])
+
+    def _in_bounds(self, cell):
+        return all(0 <= c < size for c, size in zip(cell, self._shape))
+
+    def _index(self, cell):
+        i = 0
+        for c, size in zip(reversed(cell), reversed(self._shape)):
+            i = i * size + c
+        return i
+
+    def _cell(self, i):
+        cell = []
+        for size in self._shape:
+            i, c = divmod(i, size)
+            cell.append(c)
+        return tuple(cell)
+
+    def _neighbours(self, i):
+        stride = 1
+        for size in self._shape:
+            c = (i // stride) % size
+            if c > 0:
+                yield i - stride
+            elif self._portals and size > 1:
+                yield i + (size - 1) * stride
+            if c < size - 1:
+                yield i + stride
+            elif self._portals and size > 1:
+                yield i - (size - 1) * stride
+            stride *= size
+
+    def _find(self, i):
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, i, j):
+        root_i, root_j = self._find(i), self._find(j)
+        if root_i == root_j:
+            return
+        if len(self._members[root_i]) < len(self._members[root_j]):
+            root_i, root_j = root_j, root_i
+
+        members = self._members[root_i]
+        for cell in self._members.pop(root_j):
+            self._positions[cell] = len(members)
+            members.append(cell)
+        self._parent[root_j] = root_i
+
+        if root_j in self._ghosts:
+            self._ghosts.setdefault(root_i, set()).update(self._ghosts.pop(root_j))
+        if root_j in self._dirty:
+            self._dirty.discard(root_j)
+            self._dirty.add(root_i)
+
+    def _add(self, i):
+        if self._positions[i] >= 0:
+            return
+        # a ghost cell can still be part of the paths of other cells
+        # so it gets readded to its (possibly stale) region instead of a new one
+        root = self._find(i)
+        members = self._members.setdefault(root, [])
+        free_neighbours = [j for j in self._neighbours(i) if self._positions[j] >= 0]
+        if members and all(self._find(j) != root for j in free_neighbours):
+            # the cell is not connected to the rest of its stale region anymore
+            self._dirty.add(root)
+        self._positions[i] = len(members)
+        members.append(i)
+        for j in free_neighbours:
+            self._union(i, j)
+
+    def _remove(self, i):
+        if self._positions[i] < 0:
+            return
+        root = self._find(i)
+        members = self._members[root]
+        last = members.pop()
+        if last != i:
+            members[self._positions[i]] = last
+            self._positions[last] = self._positions[i]
+        self._positions[i] = -1
+
+        # cells whose removal can not split the region are not kept as ghosts,
+        # readding them to a stale region is detected in _add
+        if not self._locally_connected(i):
+            self._ghosts.setdefault(root, set()).add(i)
+            self._dirty.add(root)
+
+    def _locally_connected(self, i):
+        # if the free neighbours of a cell are connected within the surrounding
+        # (3x3 or 3x3x3) block, occupying the cell can not split its region
+        # this holds for most moves in open space and avoids most rebuilds
+        neighbours = [j for j in self._neighbours(i) if self._positions[j] >= 0]
+        if len(neighbours) <= 1:
+            return True
+
+        block = [self._cell(i)]
+        for d, size in enumerate(self._shape):
+            shifted_block = []
+            for cell in block:
+                for offset in (-1, 0, 1):
+                    c = cell[d] + offset
+                    if self._portals:
+                        c %= size
+                    elif not 0 <= c < size:
+                        continue
+                    shifted_block.append((*cell[:d], c, *cell[d + 1 :]))
+            block = shifted_block
+        block = {self._index(cell) for cell in block}
+        block.discard(i)
+
+        reached = {neighbours[0]}
+        stack = [neighbours[0]]
+        while stack:
+            for j in self._neighbours(stack.pop()):
+                if j in block and j not in reached and self._positions[j] >= 0:
+                    reached.add(j)
+                    stack.append(j)
+        return all(j in reached for j in neighbours)
+
+    def _rebuild(self, root):
+        region = self._members.pop(root)
+        for i in self._ghosts.pop(root, ()):
+            if self._positions[i] < 0:
+                self._parent[i] = i
+        for i in region:
+            self._positions[i] = -1
+        self._flood(region)
+
+    def _flood(self, region):
+        # flood fill restricted to the given cells
+        region = set(region)
+        while region:
+            new_root = region.pop()
+            members = [new_root]
+            self._parent[new_root] = new_root
+            self._positions[new_root] = 0
+            self._members[new_root] = members
+            stack = [new_root]
+            while stack:
+                for j in self._neighbours(stack.pop()):
+                    if j in region:
+                        region.discard(j)
+                        self._parent[j] = new_root
+                        self._positions[j] = len(members)
+                        members.append(j)
+                        stack.append(j)
+
+    def add(self, cell):
+        if self._in_bounds(cell):
+            self._add(self._index(cell))
+
+    def remove(self, cell):
+        if self._in_bounds(cell):
+            self._remove(self._index(cell))
+
+    def is_free(self, cell):
+        return self._in_bounds(cell) and self._positions[self._index(cell)] >= 0
+
+    def random_free(self):
+        regions = list(self._members.values())
+        n_free = sum(len(region) for region in regions)
+        if n_free == 0:
+            return None
+        return self._cell(self._random_member(regions, n_free))
+
+    @staticmethod
+    def _random_member(regions, n_cells):
+        k = random.randrange(n_cells)
+        for region in regions:
+            if k < len(region):
+                return region[k]
+            k -= len(region)
+
+    def random_reachable(self, cell):
+        # returns a random free cell from the regions adjacent to the given cell
+        # or None if there is none
+        if not self._in_bounds(cell):
+            return None
+        i = self._index(cell)
+
+        roots = {self._find(j) for j in self._neighbours(i) if self._positions[j] >= 0}
+        for root in roots & self._dirty:
+            self._dirty.discard(root)
+            self._rebuild(root)
+        roots = {self._find(j) for j in self._neighbours(i) if self._positions[j] >= 0}
+
+        regions = [self._members[root] for root in roots]
+        n_reachable = sum(len(region) for region in regions)
+        if n_reachable == 0:
+            return None
+        return self._cell(self._random_member(regions, n_reachable))
 
 
 def zigzag_obstacle_generator(height, width, n_zigzags, zizag_portion, vertical=True):
@@ -112,6 +369,66 @@ def random_obstacle_generator(height, width, n_obstacles, snake_head):
     return obstacles
 
 
+def wall_obstacle_generator(height, width, depth, n_walls, hole_size):
+    # walls along the x axis with a hole at alternating corners
+    obstacles = set()
+    d = int(width / (n_walls + 1))
+    for i in range(n_walls):
+        x = int(d + i * d)
+        corner = i % 2 == 0
+        for y in range(height):
+            for z in range(depth):
+                in_hole_y = y < hole_size if corner else y >= height - hole_size
+                in_hole_z = z < hole_size if corner else z >= depth - hole_size
+                if not (in_hole_y and in_hole_z):
+                    obstacles.add((x, y, z))
+    return obstacles
+
+
+def random_obstacle_generator_3d(height, width, depth, n_obstacles, snake_head):
+    obstacles = set()
+    while len(obstacles) < n_obstacles:
+        new_obst = (
+            random.randrange(width),
+            random.randrange(height),
+            random.randrange(depth),
+        )
+        if max(abs(h - o) for h, o in zip(snake_head, new_obst)) > 5:
+            obstacles.add(new_obst)
+    return obstacles
+
+
+class FixedTimestep:
+    # accumulates the elapsed time and returns the number of simulation steps
+    # which are due, the remainder of a step is carried over to the next frame
+    # while time beyond the maximum number of steps per frame is dropped, so the
+    # game does not fast forward after a stall (e.g. a progress dialog)
+
+    def __init__(self, timestep, max_steps_per_frame):
+        self.timestep = timestep
+        self._max_steps_per_frame = max_steps_per_frame
+        self._accumulator = 0.0
+        self._last_time = None
+
+    def restart(self):
+        self._accumulator = 0.0
+        self._last_time = time.perf_counter()
+
+    def due_steps(self):
+        now = time.perf_counter()
+        if self._last_time is None:
+            self._last_time = now
+        self._accumulator = min(
+            self._accumulator + now - self._last_time,
+            self._max_steps_per_frame * self.timestep,
+        )
+        self._last_time = now
+
+        n_steps = min(int(self._accumulator / self.timestep), self._max_steps_per_frame)
+        self._accumulator -= n_steps * self.timestep
+        return n_steps
+
+
 class Game:
     start_configs = {
         "standard": {
@@ -168,6 +485,36 @@ class Game:
             "snake_direction": "up",
             "snake_length": 5,
         },
+        "cube": {
+            "portal": True,
+            "height": 16,
+            "width": 16,
+            "depth": 16,
+            "obstacles": set(),
+            "snake_head": (8, 8, 8),
+            "snake_direction": "right",
+            "snake_length": 5,
+        },
+        "cube walls": {
+            "portal": False,
+            "height": 16,
+            "width": 24,
+            "depth": 16,
+            "obstacles": wall_obstacle_generator(16, 24, 16, 3, 5),
+            "snake_head": (2, 8, 8),
+            "snake_direction": "up",
+            "snake_length": 5,
+        },
+        "cube random obstacles": {
+            "portal": True,
+            "height": 16,
+            "width": 16,
+            "depth": 16,
+            "obstacles": random_obstacle_generator_3d(16, 16, 16, 150, (8, 8, 8)),
+            "snake_head": (8, 8, 8),
+            "snake_direction": "right",
+            "snake_length": 5,
+        },
     }
 
     maze_voxel_style = {
@@ -202,8 +549,31 @@ class Game:
     }
 
     def __init__(
-        self, world, game_ui, mover_event_id, min_move_time_delta, max_move_time_delta
+        self,
+        world,
+        game_ui,
+        mover_event_id,
+        min_move_time_delta,
+        max_move_time_delta,
+        snake_runs=None,
+        maze_cache=None,
+        render_interval=None,
+        max_steps_per_frame=10,
+        spectator=None,
     ):
+        # if a spectator publisher is given every published frame is passed to it
+        self._spectator = spectator
+        # if snake runs are given the snake body is drawn by them instead of voxels
+        self._snake_runs = snake_runs
+        # if a maze cache is given the maze and portal are drawn by it
+        self._maze_cache = maze_cache
+        self._content_voxel_styles = {
+            "head": self.snake_head_voxel_style,
+            "body": self.snake_body_voxel_style if snake_runs is None else None,
+            "food": self.food_voxel_style,
+            None: None,
+        }
+
         self._world = world
         self._game_ui = game_ui
 
@@ -211,133 +581,286 @@ class Game:
         self._max_move_time_delta = max_move_time_delta
         self._speed = None
         self._move_time_delta = None
+        # if a render interval is given (turbo mode) the mover fires with this
+        # interval and the snake is moved with a fixed timestep in between
+        self._timestep = None
+        if render_interval is not None:
+            self._timestep = FixedTimestep(max_move_time_delta, max_steps_per_frame)
         self._mover_thread = faf.utils.PeriodicExecuter(
-            self._move_time_delta,
+            render_interval,
             lambda: adsk.core.Application.get().fireCustomEvent(mover_event_id),
         )
         self.speed = self._game_ui.speed_slider.valueOne
 
+        # directions are applied one per move so fast key sequences are not lost
+        self._direction_queue = deque()
+        self._max_queued_directions = 4
+
         self._state = "start"
 
+        self._world_name = None
         self._score = None
         self._height = None
         self._width = None
+        self._depth = None
         self._plane = None
         self._maze = None
         self._portal = None
-        self._possible_food_positions = None
+        self._free_cells = None
         self._snake = None
         self._food = None
 
+        self._epoch = 0
+        self._moves = 0
+        self._frame = None
+        # frame which is currently drawn and the styles of its dynamic voxels
+        self._rendered_frame = None
+        self._drawn_voxels = {}
+
         self.build_start_state()
 
+    @staticmethod
+    def _to_volume(cell):
+        return cell if len(cell) == 3 else (*cell, 0)
+
+    def _border_cells(self):
+        if self._depth == 1:
+            # ring around the plane
+            return set().union(
+                {(i, -1, 0) for i in range(-1, self._width + 1)},
+                {(i, self._height, 0) for i in range(-1, self._width + 1)},
+                {(-1, j, 0) for j in range(-1, self._height + 1)},
+                {(self._width, j, 0) for j in range(-1, self._height + 1)},
+            )
+        # only the edges of the box around the volume to keep the view clear
+        borders = set()
+        for x in range(-1, self._width + 1):
+            for y in range(-1, self._height + 1):
+                for z in range(-1, self._depth + 1):
+                    on_border = (
+                        (x in (-1, self._width))
+                        + (y in (-1, self._height))
+                        + (z in (-1, self._depth))
+                    )
+                    if on_border >= 2:
+                        borders.add((x, y, z))
+        return borders
+
     def build_start_state(self):
         if self.state != "start":
             return
 
-        start_config = self.start_configs[self._game_ui.maze_dropdown.selectedItem.name]
+        self._world_name = self._game_ui.maze_dropdown.selectedItem.name
+        start_config = self.start_configs[self._world_name]
 
         self._score = 0
 
         self._height = start_config["height"]
         self._width = start_config["width"]
+        self._depth = start_config.get("depth", 1)
 
-        self._plane = "xy"  # TODO setable
+        # camera plane of flat worlds, volumetric worlds are viewed at an angle
+        self._plane = "xy"
 
-        self._maze = set().union(
-            start_config["obstacles"],
-        )
+        obstacles = {self._to_volume(c) for c in start_config["obstacles"]}
+        self._maze = set(obstacles)
         self._portal = set()
 
-        borders = set().union(
-            {(i, -1) for i in range(-1, self._width + 1)},
-            {(i, self._height) for i in range(-1, self._width + 1)},
-            {(-1, j) for j in range(-1, self._height + 1)},
-            {(self._width, j) for j in range(-1, self._height + 1)},
-        )
-        # (-1,-1) -> (width,0)
-        # (-1,height) -> (width, height)
-        # (-1,-1) -> (-1,height)
-        # (width,-1) -> (width,height)
-
+        # out of bounds movements are prevented by the free cell index
+        # so the borders are only needed for drawing
         if start_config["portal"]:
-            self._portal = self._portal.union(borders)
+            self._portal = self._border_cells()
         else:
-            self._maze = self._maze.union(borders)
-
-        # use list to enable the use of random.choice
-        self._possible_food_positions = {
-            (i, j) for i in range(0, self._width) for j in range(0, self._height)
-        } - start_config["obstacles"]
+            self._maze = self._maze.union(self._border_cells())
 
         self._snake = Snake(
-            start_config["snake_head"],
+            self._to_volume(start_config["snake_head"]),
             start_config["snake_direction"],
             start_config["snake_length"],
-            portals=(self._width, self._height) if start_config["portal"] else None,
+            portals=(self._width, self._height, self._depth)
+            if start_config["portal"]
+            else None,
+            volumetric=self._depth > 1,
+        )
+
+        self._free_cells = ReachabilityIndex(
+            (self._width, self._height, self._depth),
+            obstacles.union([self._snake.head], self._snake.body),
+            portals=start_config["portal"],
         )
 
         self._food = self._find_food_position()
 
-    def _find_food_position(self):
-        return random.choice(
-            list(
-                self._possible_food_positions
-                - {self._snake.head}
-                - set(self._snake.body)
-            )
+        self._epoch += 1
+        self._moves = 0
+        self._publish_frame()
+
+    def _publish_frame(self):
+        # the maze and portal sets are not changed after building the start state
+        # and therfore shared between the frames
+        self._frame = Frame(
+            self._epoch,
+            self._moves,
+            self._snake.elements,
+            self._food,
+            self._score,
+            self._state,
+            self._maze,
+            self._portal,
+            (self._width, self._height, self._depth),
         )
+        if self._spectator is not None:
+            self._spectator.publish(self._frame)
+
+    def _find_food_position(self):
+        # only place food where the snake can reach it
+        food = self._free_cells.random_reachable(self._snake.head)
+        if food is not None:
+            return food
+        return self._free_cells.random_free()
+
+    def advance(self, n_steps=None):
+        # moves the snake by the given number of steps, by the number of steps
+        # which are due in turbo mode or by a single step otherwise
+        if n_steps is None:
+            n_steps = 1 if self._timestep is None else self._timestep.due_steps()
+        for _ in range(n_steps):
+            if self.state != "running":
+                break
+            self.move_snake()
 
     def move_snake(self):
         if self.state != "running":
             return
-        self._snake.move()
-        if self._snake.head in self._maze or self._snake.head in self._snake.body:
+        if self._direction_queue:
+            self._snake.set_direction(self._direction_queue.popleft())
+        last_tail = self._snake.move()
+
+        # the tail is freed before the collision check so the snake can follow it
+        eats = self._snake.head == self._food
+        if not eats:
+            self._free_cells.add(last_tail)
+        if not self._free_cells.is_free(self._snake.head):
+            if not eats:
+                self._free_cells.remove(last_tail)
             self._mover_thread.pause()
             self._snake.undo_move()
             self.state = "over"
             self._game_ui.update_leaderboard(self._score)
+            return
+        self._free_cells.remove(self._snake.head)
 
-        if self._snake.head == self._food:
+        if eats:
             self._snake.eat()
             self._food = self._find_food_position()
             self._score += 1
             self._game_ui.update_score(self._score)
 
-    def update_world(self, use_progress_dialog=False, *args, **kwargs):
-        # TODO adapt for setable drawing plane
-        voxels = {
-            **{(*c, 0): self.maze_voxel_style for c in self._maze},
-            **{(*c, 0): self.snake_body_voxel_style for c in self._snake.body},
-            **{(*self._snake.head, 0): self.snake_head_voxel_style},
-            **{(*self._food, 0): self.food_voxel_style},
-            **{(*c, 0): self.portal_voxel_style for c in self._portal},
+        self._moves += 1
+        self._publish_frame()
+
+    def _static_voxels(self, frame):
+        return {
+            **{c: self.maze_voxel_style for c in frame.maze},
+            **{c: self.portal_voxel_style for c in frame.portal},
         }
 
+    def update_world(self, use_progress_dialog=False, *args, **kwargs):
+        # renders the latest published frame
+        frame = self._frame
+        rendered_frame = self._rendered_frame
+        changes = frame_changes(rendered_frame, frame)
+        self._rendered_frame = frame
+
+        if changes is not None and not use_progress_dialog:
+            # only redraw the cells which have changed since the last update
+            for cell, content in changes.items():
+                style = self._content_voxel_styles[content]
+                drawn_style = self._drawn_voxels.get(cell)
+                if style is drawn_style:
+                    continue
+                # a voxel of the same class (e.g. the old head becoming a body
+                # cell) is only restyled by the world instead of being recreated
+                if drawn_style is not None and (
+                    style is None
+                    or style["voxel_class"] is not drawn_style["voxel_class"]
+                ):
+                    self._world.remove_voxel(cell)
+                    del self._drawn_voxels[cell]
+                if style is not None:
+                    self._world.add_voxel(cell, **style)
+                    self._drawn_voxels[cell] = style
+            if self._snake_runs is not None:
+                self._snake_runs.update(rendered_frame, frame)
+            return
+
+        body_style = self._content_voxel_styles["body"]
+        self._drawn_voxels = {
+            **{c: body_style for c in frame.snake[1:] if body_style is not None},
+            **{frame.snake[0]: self.snake_head_voxel_style},
+            **{frame.food: self.food_voxel_style},
+        }
+        progress_dialog = None
         if use_progress_dialog:
             progress_dialog = self._game_ui.create_progress_dialog()
+
+        if self._maze_cache is None:
+            voxels = {**self._static_voxels(frame), **self._drawn_voxels}
+        else:
+            self._maze_cache.show(
+                (self._world_name, self._world.grid_size),
+                partial(self._static_voxels, frame),
+                progress_dialog,
+            )
+            voxels = dict(self._drawn_voxels)
+
+        if progress_dialog is not None:
             self._world.update(voxels, progress_dialog, *args, **kwargs)
         else:
             self._world.update(voxels, *args, **kwargs)
 
+        if self._snake_runs is not None:
+            self._snake_runs.rebuild(frame)
+
+    def _queue_direction(self, direction):
+        # keys beyond the queue size are ignored instead of dropping earlier turns
+        if len(self._direction_queue) >= self._max_queued_directions:
+            return
+        if self._direction_queue:
+            last_direction = self._direction_queue[-1]
+        else:
+            last_direction = self._snake.direction
+        if direction != last_direction:
+            self._direction_queue.append(direction)
+
     def left(self):
         if self._state == "running":
-            self._snake.set_direction("left")
+            self._queue_direction("left")
 
     def right(self):
         if self._state == "running":
-            self._snake.set_direction("right")
+            self._queue_direction("right")
 
     def up(self):
         if self._state == "running":
-            self._snake.set_direction("up")
+            self._queue_direction("up")
 
     def down(self):
         if self._state == "running":
-            self._snake.set_direction("down")
+            self._queue_direction("down")
+
+    def forward(self):
+        if self._state == "running" and self._depth > 1:
+            self._queue_direction("forward")
+
+    def backward(self):
+        if self._state == "running" and self._depth > 1:
+            self._queue_direction("backward")
 
     def play(self):
         if self._state in ("paused", "start"):
+            if self._timestep is not None:
+                self._timestep.restart()
             self._mover_thread.start()
             self.state = "running"
 
@@ -350,6 +873,7 @@ class Game:
         if self._state in ("running", "paused", "over", "start"):
             self._mover_thread.reset()
             self._mover_thread.pause()
+            self._direction_queue.clear()
             self.state = "start"
             self.build_start_state()
 
@@ -364,10 +888,34 @@ class Game:
     def width(self):
         return self._width
 
+    @property
+    def depth(self):
+        return self._depth
+
     @property
     def plane(self):
         return self._plane
 
+    @property
+    def frame(self):
+        return self._frame
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def snake(self):
+        return self._snake
+
+    @property
+    def food(self):
+        return self._food
+
+    @property
+    def free_cells(self):
+        return self._free_cells
+
     @property
     def game_ui(self):
         return self._game_ui
@@ -387,7 +935,10 @@ class Game:
             self._game_ui.n_speed_levels - 1
         )
         self._move_time_delta = self._max_move_time_delta - new_speed * delta_time
-        self._mover_thread.interval = self._move_time_delta
+        if self._timestep is None:
+            self._mover_thread.interval = self._move_time_delta
+        else:
+            self._timestep.timestep = self._move_time_delta
 
     @property
     def state(self):
@@ -396,4 +947,6 @@ class Game:
     @state.setter
     def state(self, new_state):
         self._state = new_state
-        self._game_ui.change_state(new_state)
\ No newline at end of file
+        self._game_ui.change_state(new_state)
+        if self._snake is not None:
+            self._publish_frame()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from functools import wraps
+from collections import Counter, defaultdict
+
+
+class HandlerProfiler:
+    # samples the stack of the thread executing a wrapped handler and aggregates
+    # them per handler, the stacks are dumped in the collapsed stack format
+    # ("frame;frame;frame count") used by flamegraph.pl, speedscope, inferno, ...
+
+    def __init__(self, interval=0.005):
+        self._interval = interval
+
+        self._stacks = defaultdict(Counter)
+        # the stacks are written by the sampler thread and dumped by the main thread
+        self._stacks_lock = threading.Lock()
+        # (handler name, thread id) of the handler which is currently executed
+        self._active = None
+        self._stop_event = threading.Event()
+        self._sampler_thread = None
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _sample(self):
+        while not self._stop_event.wait(self._interval):
+            active = self._active
+            if active is None:
+                continue
+            handler_name, thread_id = active
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack = self._collapse(frame)
+                with self._stacks_lock:
+                    self._stacks[handler_name][stack] += 1
+
+    def start(self):
+        if self._sampler_thread is not None:
+            return
+        self._stop_event.clear()
+        self._sampler_thread = threading.Thread(target=self._sample, daemon=True)
+        self._sampler_thread.start()
+
+    def stop(self):
+        if self._sampler_thread is None:
+            return
+        self._stop_event.set()
+        self._sampler_thread.join()
+        self._sampler_thread = None
+
+    def wrap(self, handler, dump_folder=None):
+        @wraps(handler)
+        def wrapped_handler(*args, **kwargs):
+            # handlers are not reentrant in fusion but nested calls (e.g. doExecute
+            # within inputChanged) should be accounted to the outer handler
+            outer = self._active
+            if outer is None:
+                self._active = (handler.__name__, threading.get_ident())
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self._active = outer
+                # the handler with a dump folder ends the profiling, the sampler
+                # is stopped here so that the whole handler is sampled
+                if dump_folder is not None and outer is None:
+                    self.stop()
+                    self.dump(dump_folder)
+
+        return wrapped_handler
+
+    def dump(self, folder):
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        # the sampler continues with new stacks while the old ones are written
+        with self._stacks_lock:
+            handler_stacks, self._stacks = self._stacks, defaultdict(Counter)
+        for handler_name, stacks in handler_stacks.items():
+            with open(folder / f"{timestamp}_{handler_name}.collapsed", "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
@@ -0,0 +1,371 @@
+from collections import deque, OrderedDict
+
+import adsk.core, adsk.fusion, adsk.cam
+
+
+def _step(from_cell, to_cell):
+    return tuple(t - f for f, t in zip(from_cell, to_cell))
+
+
+class _Run:
+    # straight part of the snake body drawn as a single body, direction points
+    # from the tail to the head
+    def __init__(self, cell, handle=None):
+        self.first = cell
+        self.last = cell
+        self.direction = None
+        self.length = 1
+        self.handle = handle
+        # (cell, body) of the single cells which have been merged into this run
+        # and are not deleted yet, ordered from the head to the tail end
+        self.covered = []
+
+    def contains(self, cell):
+        return sum(abs(s) for s in _step(self.first, cell)) < self.length
+
+
+class SnakeRuns:
+    # draws the snake body (without the head) with few bodies
+    # every new body cell is drawn as a single sphere, at turns or every
+    # merge_length cells the spheres at the head end are merged into the run next
+    # to them (by redrawing it) or into a new run if the snake has turned, so the
+    # snake consists of one body per straight part and only the run at the tail
+    # end is redrawn when the snake shrinks, the merged spheres are deleted with
+    # the operations which are left of a move so merging does not result in
+    # spikes of body operations
+    # as the cells of short snakes reach the tail soon they are not merged
+
+    # sphere or redraw of the merged run and redraw of the tail run
+    _operations_per_move = 4
+    # delete and create of the food by the world
+    _operations_per_food = 2
+    # shorter straight parts are not worth an additional body
+    _min_merged_cells = 3
+
+    def __init__(self, run_bodies, merge_length=8):
+        self._run_bodies = run_bodies
+        self._merge_length = merge_length
+        # the first run is the one next to the head
+        self._runs = deque()
+        self._length = 0
+        # number of single cell runs at the front which are not merged yet
+        self._n_unmerged = 0
+        # runs with covered bodies in the order of merging
+        self._covering_runs = deque()
+        self._n_covered = 0
+        self._n_operations = 0
+
+    def _add(self, first_cell, last_cell):
+        self._n_operations += 1
+        return self._run_bodies.add(first_cell, last_cell)
+
+    def _remove(self, handle):
+        self._n_operations += 1
+        self._run_bodies.remove(handle)
+
+    def _remove_run(self, run):
+        self._remove(run.handle)
+        self._n_covered -= len(run.covered)
+        for _, handle in run.covered:
+            self._remove(handle)
+        run.covered = []
+
+    def _merge_front(self):
+        # returns if the unmerged cells have been merged
+        n_cells = self._n_unmerged
+        self._n_unmerged = 0
+        if self._length <= 2 * self._merge_length:
+            return False
+
+        cells = [self._runs[i] for i in range(n_cells)]
+        direction = _step(cells[1].first, cells[0].first) if n_cells > 1 else None
+        front = self._runs[n_cells] if n_cells < len(self._runs) else None
+        if (
+            front is not None
+            and front.direction is not None
+            and front.direction == _step(front.first, cells[-1].first)
+            and direction in (None, front.direction)
+        ):
+            # the straight part continues the run next to it
+            run = front
+            self._remove(run.handle)
+        elif n_cells >= self._min_merged_cells:
+            run = _Run(cells[-1].first)
+            run.direction = direction
+            run.length = 0
+        else:
+            return False
+
+        for _ in range(n_cells):
+            self._runs.popleft()
+        if run is not front:
+            self._runs.appendleft(run)
+        run.first = cells[0].first
+        run.length += n_cells
+        run.handle = self._add(run.last, run.first)
+
+        covered = [
+            (cell.first, cell.handle) for cell in cells if cell.handle is not None
+        ]
+        if covered:
+            if not run.covered:
+                self._covering_runs.append(run)
+            run.covered[:0] = covered
+            self._n_covered += len(covered)
+        return True
+
+    def _push_front(self, cell):
+        if self._n_unmerged > 0:
+            step = _step(self._runs[0].first, cell)
+            straight = sum(abs(s) for s in step) == 1 and (
+                self._n_unmerged == 1
+                or step == _step(self._runs[1].first, self._runs[0].first)
+            )
+            if not straight:
+                self._merge_front()
+
+        run = _Run(cell)
+        self._runs.appendleft(run)
+        self._length += 1
+        self._n_unmerged += 1
+        # the cell completing a straight part is directly drawn by the merged run
+        if self._n_unmerged >= self._merge_length and self._merge_front():
+            return
+        run.handle = self._add(cell, cell)
+
+    def _pop_back(self, n_cells):
+        while n_cells > 0:
+            back = self._runs[-1]
+            if back.length <= n_cells:
+                n_cells -= back.length
+                self._length -= back.length
+                self._remove_run(back)
+                self._runs.pop()
+                continue
+            # only merged runs are longer than a single cell
+            back.last = tuple(
+                c + d * n_cells for c, d in zip(back.last, back.direction)
+            )
+            back.length -= n_cells
+            self._length -= n_cells
+            # the covered bodies of the freed cells are deleted
+            while back.covered and not back.contains(back.covered[-1][0]):
+                self._remove(back.covered.pop()[1])
+                self._n_covered -= 1
+            self._remove(back.handle)
+            back.handle = self._add(back.last, back.first)
+            n_cells = 0
+        self._n_unmerged = min(self._n_unmerged, len(self._runs))
+
+    def _delete_covered(self, n_bodies):
+        # the covered bodies of more than two merges are deleted anyway
+        n_bodies = max(n_bodies, self._n_covered - 2 * self._merge_length)
+        while n_bodies > 0 and self._covering_runs:
+            run = self._covering_runs[0]
+            if run.covered:
+                self._remove(run.covered.pop()[1])
+                self._n_covered -= 1
+                n_bodies -= 1
+            if not run.covered:
+                self._covering_runs.popleft()
+
+    def clear(self):
+        for run in self._runs:
+            self._remove_run(run)
+        self._runs.clear()
+        self._covering_runs.clear()
+        self._length = 0
+        self._n_unmerged = 0
+
+    def rebuild(self, frame):
+        # a full redraw directly draws the merged runs
+        self.clear()
+        for cell in reversed(frame.snake[1:]):
+            if self._runs:
+                front = self._runs[0]
+                step = _step(front.first, cell)
+                if (
+                    sum(abs(s) for s in step) == 1
+                    and front.direction in (None, step)
+                ):
+                    front.first = cell
+                    front.direction = step
+                    front.length += 1
+                    self._length += 1
+                    continue
+            self._runs.appendleft(_Run(cell))
+            self._length += 1
+        for run in self._runs:
+            run.handle = self._add(run.last, run.first)
+
+    def update(self, old_frame, new_frame):
+        self._n_operations = 0
+        n_moves = new_frame.moves - old_frame.moves
+        # the old head and the cells passed by the head are new body cells
+        for cell in reversed(new_frame.snake[1 : n_moves + 1]):
+            self._push_front(cell)
+        self._pop_back(self._length - (len(new_frame.snake) - 1))
+        n_operations = self._n_operations
+        if old_frame.food != new_frame.food:
+            n_operations += self._operations_per_food
+        self._delete_covered(self._operations_per_move * n_moves - n_operations)
+
+
+class FusionRunBodies:
+    # creates the bodies for the runs of SnakeRuns within a component, the runs
+    # are cylinders with spherical caps with the diameter of a voxel
+
+    def __init__(self, component, world, offset, style):
+        self._component = component
+        self._world = world
+        self._offset = tuple(offset) + (0,) * (3 - len(offset))
+        self._style = style
+        self._appearance = None
+
+    def _center(self, cell):
+        return adsk.core.Point3D.create(
+            *((c + o) * self._world.grid_size for c, o in zip(cell, self._offset))
+        )
+
+    def _get_appearance(self):
+        if self._appearance is not None and self._appearance.isValid:
+            return self._appearance
+
+        design = adsk.fusion.Design.cast(self._component.parentDesign)
+        name = f"{self._style['appearance']} {self._style['color']}"
+        self._appearance = design.appearances.itemByName(name)
+        if self._appearance is None:
+            library_appearance = (
+                adsk.core.Application.get()
+                .materialLibraries.itemByName("Fusion 360 Appearance Library")
+                .appearances.itemByName(self._style["appearance"])
+            )
+            self._appearance = design.appearances.addByCopy(library_appearance, name)
+            color_property = self._appearance.appearanceProperties.itemByName("Color")
+            if self._style["color"] is not None and color_property is not None:
+                color_property.value = adsk.core.Color.create(*self._style["color"])
+        return self._appearance
+
+    def add(self, first_cell, last_cell):
+        temp_brep_manager = adsk.fusion.TemporaryBRepManager.get()
+        radius = self._world.grid_size / 2
+        start, end = self._center(first_cell), self._center(last_cell)
+
+        body = temp_brep_manager.createSphere(start, radius)
+        if first_cell != last_cell:
+            for tool in (
+                temp_brep_manager.createCylinderOrCone(start, radius, end, radius),
+                temp_brep_manager.createSphere(end, radius),
+            ):
+                temp_brep_manager.booleanOperation(
+                    body, tool, adsk.fusion.BooleanTypes.UnionBooleanType
+                )
+
+        body = self._component.bRepBodies.add(body)
+        body.name = self._style["additional_properties"]["name"]
+        body.appearance = self._get_appearance()
+        return body
+
+    @staticmethod
+    def remove(body):
+        if body.isValid:
+            body.deleteMe()
+
+
+def scale_bodies(component, factor):
+    # scales all bodies of the component with a single scale feature around the
+    # origin, as the voxel positions are multiples of the grid size this is the
+    # same as rebuilding them with a scaled grid size
+    bodies = adsk.core.ObjectCollection.create()
+    for body in component.bRepBodies:
+        bodies.add(body)
+    if bodies.count == 0:
+        return
+
+    scale_features = component.features.scaleFeatures
+    scale_input = scale_features.createInput(
+        bodies,
+        component.originConstructionPoint,
+        adsk.core.ValueInput.createByReal(factor),
+    )
+    scale_features.add(scale_input)
+
+
+class MazeCache:
+    # keeps the static maze geometry of every visited (world, block size) in its
+    # own child component, switching to a cached maze only toggles the visibility
+    # of the occurrences
+    # the least recently used mazes are deleted if the number of cached voxels
+    # (as measure for the memory used by fusion) exceeds the given maximum
+
+    def __init__(self, component, create_world, max_voxels):
+        self._component = component
+        # callable(grid_size, component) -> VoxelWorld
+        self._create_world = create_world
+        self._max_voxels = max_voxels
+
+        # key -> [occurrence, number of voxels]
+        self._entries = OrderedDict()
+        self._active_key = None
+
+    def _evict(self):
+        n_voxels = sum(n for _, n in self._entries.values())
+        for key in list(self._entries.keys()):
+            if n_voxels <= self._max_voxels:
+                break
+            if key == self._active_key:
+                continue
+            occurrence, n = self._entries.pop(key)
+            if occurrence.isValid:
+                occurrence.deleteMe()
+            n_voxels -= n
+
+    def show(self, key, create_voxels, progress_dialog=None):
+        # key: (world name, grid size), create_voxels: callable returning the
+        # voxel descriptions (only called if the maze is not cached yet)
+        if key == self._active_key:
+            return
+        if self._active_key is not None:
+            self._entries[self._active_key][0].isLightBulbOn = False
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._entries[key][0].isLightBulbOn = True
+        else:
+            occurrence = self._component.occurrences.addNewComponent(
+                adsk.core.Matrix3D.create()
+            )
+            occurrence.component.name = f"{key[0]} maze"
+            voxels = create_voxels()
+            world = self._create_world(key[1], occurrence.component)
+            if progress_dialog is not None:
+                world.update(voxels, progress_dialog)
+            else:
+                world.update(voxels)
+            self._entries[key] = [occurrence, len(voxels)]
+
+        self._active_key = key
+        self._evict()
+
+    def rescale(self, new_grid_size):
+        # the visible maze is rescaled together with the other bodies
+        if self._active_key is None:
+            return
+        world_name, grid_size = self._active_key
+        entry = self._entries.pop(self._active_key)
+        scale_bodies(entry[0].component, new_grid_size / grid_size)
+
+        new_key = (world_name, new_grid_size)
+        if new_key in self._entries:
+            occurrence, _ = self._entries.pop(new_key)
+            if occurrence.isValid:
+                occurrence.deleteMe()
+        self._entries[new_key] = entry
+        self._active_key = new_key
+
+    def discard_hidden(self):
+        for key in list(self._entries.keys()):
+            if key != self._active_key:
+                occurrence, _ = self._entries.pop(key)
+                if occurrence.isValid:
+                    occurrence.deleteMe()
@@ -0,0 +1,142 @@
+import sys
+import json
+import random
+import argparse
+
+from .standin import (
+    install_adsk_standin,
+    RecordingWorld,
+    RecordingRunBodies,
+    StandinGameUI,
+)
+
+# the game modules import the fusion api on module level
+install_adsk_standin()
+
+# pylint:disable=wrong-import-position
+from .game import Game
+from .render import SnakeRuns
+from .accounting import (
+    OperationStats,
+    InstrumentedWorld,
+    InstrumentedRunBodies,
+    BODY_OPERATIONS,
+)
+
+# replays a scripted game outside of fusion and checks the number of body
+# operations per frame against a budget, run from the folder containing the addin:
+# python -m Snacade.src.replay --world standard --ticks 500 --budget 3
+
+
+def autopilot(game):
+    # greedy towards the food, only used if no inputs are scripted
+    best = None
+    for direction in game.snake.allowed_moves:
+        new_head = game.snake.next_head(direction)
+        if not game.free_cells.is_free(new_head):
+            continue
+        distance = sum(abs(h - f) for h, f in zip(new_head, game.food))
+        if best is None or distance < best[0]:
+            best = (distance, direction)
+    if best is not None:
+        getattr(game, best[1])()
+
+
+def replay(
+    world_name, n_ticks, inputs=None, seed=0, merged_snake=False, steps_per_frame=1
+):
+    random.seed(seed)
+
+    stats = OperationStats()
+    world = InstrumentedWorld(RecordingWorld(1), stats)
+    snake_runs = None
+    if merged_snake:
+        snake_runs = SnakeRuns(InstrumentedRunBodies(RecordingRunBodies(), stats))
+    game = Game(
+        world, StandinGameUI(world_name, 0, 5), None, 0.1, 0.5, snake_runs=snake_runs
+    )
+
+    # the initial build is the first frame
+    game.update_world(use_progress_dialog=True)
+    stats.end_frame()
+
+    game.play()
+    for tick in range(n_ticks):
+        if inputs is None:
+            autopilot(game)
+        elif tick in inputs:
+            getattr(game, inputs[tick])()
+        game.move_snake()
+        # only every steps_per_frame-th tick is rendered like in turbo mode
+        if (tick + 1) % steps_per_frame == 0 or game.state == "over":
+            game.update_world()
+            stats.end_frame()
+        if game.state == "over":
+            break
+    game.stop()
+
+    return game, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a game of Snacade.")
+    parser.add_argument("--world", default="standard")
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--script",
+        help='json file like {"world": ..., "seed": ..., "ticks": ..., '
+        + '"inputs": {"<tick>": "<direction>"}}, replaces the autopilot',
+    )
+    parser.add_argument(
+        "--budget", type=int, help="maximum number of body operations per frame"
+    )
+    parser.add_argument("--output", help="json file for the per frame statistics")
+    parser.add_argument(
+        "--steps-per-frame",
+        type=int,
+        default=1,
+        help="number of ticks which are simulated per rendered frame",
+    )
+    parser.add_argument(
+        "--merged-snake",
+        action="store_true",
+        help="draw the snake body as merged runs instead of single voxels",
+    )
+    args = parser.parse_args(argv)
+
+    world_name, n_ticks, seed, inputs = args.world, args.ticks, args.seed, None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+        world_name = script.get("world", world_name)
+        n_ticks = script.get("ticks", n_ticks)
+        seed = script.get("seed", seed)
+        inputs = {int(tick): d for tick, d in script.get("inputs", {}).items()}
+
+    game, stats = replay(
+        world_name, n_ticks, inputs, seed, args.merged_snake, args.steps_per_frame
+    )
+    if args.output:
+        stats.dump(args.output)
+
+    counts, times = stats.totals()
+    tick_frames = stats.frames[1:]
+    print(f"world: {world_name}, frames: {len(tick_frames)}, score: {game.score}")
+    for operation in BODY_OPERATIONS:
+        print(f"{operation}: {counts.get(operation, 0)}")
+    for method_name, duration in sorted(times.items()):
+        print(f"{method_name}: {counts[method_name]} calls, {duration * 1000:.1f} ms")
+
+    max_operations = max(
+        (stats.body_operations(frame) for frame in tick_frames), default=0
+    )
+    print(f"max body operations per frame: {max_operations}")
+    if args.budget is not None and max_operations > args.budget:
+        print(f"budget of {args.budget} body operations per frame exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+import os
+import socket
+import struct
+import selectors
+import threading
+from collections import deque
+
+from .frames import frame_changes
+
+# binary protocol (network byte order) of the spectator stream, every message is
+# a header followed by the payload:
+# header: magic b"SC", version, message type, payload length
+# keyframe: common part, shape, snake length, number of maze and portal cells,
+#   followed by the snake (head first), maze and portal cells
+# delta: common part, snake length, number of new cells, followed by the new
+#   cells (head first), the snake is cut to the snake length at the tail end
+# common part: epoch, moves, score, state, events, food cell
+# cell: x, y, z as signed shorts, NO_CELL if there is no food
+MAGIC = b"SC"
+VERSION = 1
+KEYFRAME = 1
+DELTA = 2
+
+HEADER = struct.Struct("!2sBBI")
+COMMON = struct.Struct("!IIIBB3h")
+KEYFRAME_COUNTS = struct.Struct("!3HIII")
+DELTA_COUNTS = struct.Struct("!IH")
+CELL = struct.Struct("!3h")
+
+STATES = ("start", "running", "paused", "over")
+EVENT_ATE = 1
+EVENT_OVER = 2
+EVENT_RESET = 4
+
+NO_CELL = (-(1 << 15),) * 3
+
+
+class _Subscriber:
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = bytearray()
+
+
+class SpectatorPublisher:
+    # publishes the frames of the game on a local tcp socket
+    # publish only stores a reference to the (immutable) frame and wakes up the
+    # sender thread, so it never blocks the game, the sender always encodes the
+    # latest frame relative to the last sent one (frames in between are
+    # coalesced) and subscribers which can not keep up are dropped
+
+    def __init__(self, address=("127.0.0.1", 47474), max_pending_bytes=1 << 16):
+        self._address = address
+        self._max_pending_bytes = max_pending_bytes
+
+        self._latest_frame = None
+        self._sent_frame = None
+        # avoids a socket call per publish while the sender has not woken up yet
+        self._wakeup_pending = False
+        self._buffer = bytearray(1 << 16)
+
+        self._selector = None
+        self._server = None
+        self._wakeup_receiver = None
+        self._wakeup_sender = None
+        self._subscribers = {}
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            # on windows reusing the address would allow a second publisher to
+            # bind the same port
+            if os.name != "nt":
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(self._address)
+            server.listen()
+        except OSError:
+            server.close()
+            raise
+        server.setblocking(False)
+        self._server = server
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server, selectors.EVENT_READ)
+
+        self._wakeup_receiver, self._wakeup_sender = socket.socketpair()
+        self._wakeup_receiver.setblocking(False)
+        self._wakeup_sender.setblocking(False)
+        self._selector.register(self._wakeup_receiver, selectors.EVENT_READ)
+        # frames published before the start are sent as well
+        self._wakeup_pending = True
+        self._wake_up()
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        self._wake_up()
+        self._thread.join()
+        self._thread = None
+
+        for subscriber in list(self._subscribers.values()):
+            self._drop(subscriber)
+        for sock in (self._server, self._wakeup_receiver, self._wakeup_sender):
+            sock.close()
+        self._selector.close()
+
+    @property
+    def address(self):
+        # the bound address while started (e.g. if the port is chosen by the os)
+        if self._server is not None:
+            return self._server.getsockname()
+        return self._address
+
+    def publish(self, frame):
+        self._latest_frame = frame
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            self._wake_up()
+
+    def _wake_up(self):
+        try:
+            self._wakeup_sender.send(b"\0")
+        except (BlockingIOError, AttributeError):
+            # a wake up is already pending or the publisher is not started
+            pass
+
+    def _run(self):
+        while self._running:
+            for key, _ in self._selector.select():
+                if key.fileobj is self._server:
+                    self._accept()
+                elif key.fileobj is self._wakeup_receiver:
+                    self._clear_wakeups()
+                else:
+                    self._service(key.data)
+
+            frame = self._latest_frame
+            if frame is not None and frame is not self._sent_frame:
+                size = self._encode(self._sent_frame, frame)
+                self._sent_frame = frame
+                for subscriber in list(self._subscribers.values()):
+                    self._send(subscriber, size)
+
+    def _clear_wakeups(self):
+        self._wakeup_pending = False
+        try:
+            while self._wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _accept(self):
+        try:
+            sock, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        subscriber = _Subscriber(sock)
+        self._subscribers[sock] = subscriber
+        self._selector.register(sock, selectors.EVENT_READ, subscriber)
+
+        # new subscribers start with a keyframe of the last sent frame
+        if self._sent_frame is not None:
+            self._send(subscriber, self._encode(None, self._sent_frame))
+
+    def _service(self, subscriber):
+        try:
+            # subscribers are not expected to send anything, an empty read
+            # means that the subscriber has disconnected
+            if not subscriber.sock.recv(4096):
+                self._drop(subscriber)
+                return
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(subscriber)
+            return
+        self._flush(subscriber)
+
+    def _drop(self, subscriber):
+        self._subscribers.pop(subscriber.sock, None)
+        try:
+            self._selector.unregister(subscriber.sock)
+        except (KeyError, ValueError):
+            pass
+        subscriber.sock.close()
+
+    def _flush(self, subscriber):
+        if not subscriber.pending:
+            return True
+        try:
+            sent = subscriber.sock.send(subscriber.pending)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._drop(subscriber)
+            return False
+        del subscriber.pending[:sent]
+        events = selectors.EVENT_READ
+        if subscriber.pending:
+            events |= selectors.EVENT_WRITE
+        self._selector.modify(subscriber.sock, events, subscriber)
+        return not subscriber.pending
+
+    def _send(self, subscriber, size):
+        message = memoryview(self._buffer)[:size]
+        if subscriber.pending:
+            if len(subscriber.pending) + size > self._max_pending_bytes:
+                self._drop(subscriber)
+                return
+            subscriber.pending += message
+            self._flush(subscriber)
+            return
+
+        try:
+            sent = subscriber.sock.send(message)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._drop(subscriber)
+            return
+        if sent < size:
+            # copy as the buffer is reused for the next message
+            subscriber.pending += message[sent:]
+            self._selector.modify(
+                subscriber.sock,
+                selectors.EVENT_READ | selectors.EVENT_WRITE,
+                subscriber,
+            )
+
+    def _reserve(self, size):
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+
+    def _encode(self, old_frame, new_frame):
+        # encodes the message into the reused buffer and returns its size
+        changes = frame_changes(old_frame, new_frame)
+
+        events = 0
+        if old_frame is None or old_frame.epoch != new_frame.epoch:
+            events |= EVENT_RESET
+        elif new_frame.score > old_frame.score:
+            events |= EVENT_ATE
+        if new_frame.state == "over" and (
+            old_frame is None or old_frame.state != "over"
+        ):
+            events |= EVENT_OVER
+
+        if changes is None:
+            cells = [*new_frame.snake, *new_frame.maze, *new_frame.portal]
+            payload_size = COMMON.size + KEYFRAME_COUNTS.size + len(cells) * CELL.size
+            self._reserve(HEADER.size + payload_size)
+            HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, KEYFRAME, payload_size)
+            offset = HEADER.size
+            offset = self._pack_common(offset, new_frame, events)
+            KEYFRAME_COUNTS.pack_into(
+                self._buffer,
+                offset,
+                *new_frame.shape,
+                len(new_frame.snake),
+                len(new_frame.maze),
+                len(new_frame.portal),
+            )
+            offset += KEYFRAME_COUNTS.size
+        else:
+            n_moves = new_frame.moves - old_frame.moves
+            cells = new_frame.snake[:n_moves]
+            payload_size = COMMON.size + DELTA_COUNTS.size + len(cells) * CELL.size
+            self._reserve(HEADER.size + payload_size)
+            HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, DELTA, payload_size)
+            offset = HEADER.size
+            offset = self._pack_common(offset, new_frame, events)
+            DELTA_COUNTS.pack_into(
+                self._buffer, offset, len(new_frame.snake), len(cells)
+            )
+            offset += DELTA_COUNTS.size
+
+        for cell in cells:
+            CELL.pack_into(self._buffer, offset, *cell)
+            offset += CELL.size
+        return offset
+
+    def _pack_common(self, offset, frame, events):
+        COMMON.pack_into(
+            self._buffer,
+            offset,
+            frame.epoch,
+            frame.moves,
+            frame.score,
+            STATES.index(frame.state),
+            events,
+            *(NO_CELL if frame.food is None else frame.food),
+        )
+        return offset + COMMON.size
+
+
+class SpectatorView:
+    # reconstructs the game state from the messages of the spectator stream,
+    # can be used by viewers, recorders or bots
+
+    def __init__(self):
+        self.epoch = None
+        self.moves = None
+        self.score = None
+        self.state = None
+        self.events = 0
+        self.food = None
+        self.shape = None
+        self.snake = deque()
+        self.maze = set()
+        self.portal = set()
+
+        self._data = bytearray()
+
+    @staticmethod
+    def _unpack_cells(data, offset, n_cells):
+        cells = [
+            CELL.unpack_from(data, offset + i * CELL.size) for i in range(n_cells)
+        ]
+        return cells, offset + n_cells * CELL.size
+
+    def feed(self, data):
+        # returns the number of complete messages which have been processed
+        self._data += data
+        n_messages = 0
+        while len(self._data) >= HEADER.size:
+            magic, version, message_type, payload_size = HEADER.unpack_from(
+                self._data, 0
+            )
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Invalid spectator stream.")
+            if len(self._data) < HEADER.size + payload_size:
+                break
+            self._apply(message_type, bytes(self._data[HEADER.size :][:payload_size]))
+            del self._data[: HEADER.size + payload_size]
+            n_messages += 1
+        return n_messages
+
+    def _apply(self, message_type, payload):
+        (
+            self.epoch,
+            self.moves,
+            self.score,
+            state,
+            self.events,
+            *food,
+        ) = COMMON.unpack_from(payload, 0)
+        self.state = STATES[state]
+        self.food = None if tuple(food) == NO_CELL else tuple(food)
+        offset = COMMON.size
+
+        if message_type == KEYFRAME:
+            *shape, n_snake, n_maze, n_portal = KEYFRAME_COUNTS.unpack_from(
+                payload, offset
+            )
+            self.shape = tuple(shape)
+            offset += KEYFRAME_COUNTS.size
+            snake, offset = self._unpack_cells(payload, offset, n_snake)
+            maze, offset = self._unpack_cells(payload, offset, n_maze)
+            portal, offset = self._unpack_cells(payload, offset, n_portal)
+            self.snake = deque(snake)
+            self.maze = set(maze)
+            self.portal = set(portal)
+        elif message_type == DELTA:
+            snake_length, n_cells = DELTA_COUNTS.unpack_from(payload, offset)
+            offset += DELTA_COUNTS.size
+            cells, offset = self._unpack_cells(payload, offset, n_cells)
+            self.snake.extendleft(reversed(cells))
+            while len(self.snake) > snake_length:
+                self.snake.pop()
@@ -0,0 +1,129 @@
+import sys
+import types
+from types import SimpleNamespace
+
+# local stand-ins for the fusion api and the voxler world which allow to run the
+# game logic (e.g. for replays) outside of fusion
+
+
+class _StandinType(type):
+    # every attribute of a stand-in is another stand-in class (cached to keep
+    # identity e.g. for enum values used as dict keys), stand-ins can be called,
+    # instantiated and subclassed (for the event handler base classes)
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attribute = _StandinType(name, (_Standin,), {})
+        setattr(cls, name, attribute)
+        return attribute
+
+
+class _Standin(metaclass=_StandinType):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(type(self), name)
+
+    def __call__(self, *args, **kwargs):
+        return type(self)()
+
+
+def _standin_module(name):
+    module = types.ModuleType(name)
+    cache = {}
+
+    def __getattr__(attribute_name):
+        if attribute_name.startswith("__"):
+            raise AttributeError(attribute_name)
+        if attribute_name not in cache:
+            cache[attribute_name] = _StandinType(attribute_name, (_Standin,), {})
+        return cache[attribute_name]
+
+    module.__getattr__ = __getattr__
+    return module
+
+
+def install_adsk_standin():
+    # only used if the real api is not available (i.e. outside of fusion)
+    try:
+        import adsk.core  # pylint:disable=unused-import
+
+        return False
+    except ImportError:
+        pass
+
+    adsk = types.ModuleType("adsk")
+    adsk.__path__ = []
+    sys.modules["adsk"] = adsk
+    for submodule_name in ("core", "fusion", "cam"):
+        submodule = _standin_module(f"adsk.{submodule_name}")
+        setattr(adsk, submodule_name, submodule)
+        sys.modules[f"adsk.{submodule_name}"] = submodule
+    return True
+
+
+class RecordingWorld:
+    # stand-in for vox.VoxelWorld which only keeps track of the voxel styles
+    def __init__(self, grid_size, component=None, offset=(0, 0, 0)):
+        self.grid_size = grid_size
+        self.component = component
+        self.offset = offset
+        self.voxels = {}
+
+    def update(self, voxels, progress_dialog=None, *args, **kwargs):
+        self.voxels = dict(voxels)
+
+    def add_voxel(self, coord, **style):
+        self.voxels[coord] = style
+
+    def remove_voxel(self, coord):
+        self.voxels.pop(coord, None)
+
+    def clear(self):
+        self.voxels = {}
+
+
+class RecordingRunBodies:
+    # stand-in for FusionRunBodies which only keeps track of the runs
+    def __init__(self):
+        self.runs = {}
+        self._next_handle = 0
+
+    def add(self, first_cell, last_cell):
+        self._next_handle += 1
+        self.runs[self._next_handle] = (first_cell, last_cell)
+        return self._next_handle
+
+    def remove(self, handle):
+        del self.runs[handle]
+
+
+class StandinGameUI:
+    # provides the parts of GameUI which are used by the game
+    def __init__(self, world_name, speed_level, n_speed_levels):
+        self.maze_dropdown = SimpleNamespace(
+            selectedItem=SimpleNamespace(name=world_name)
+        )
+        self.speed_slider = SimpleNamespace(valueOne=speed_level)
+        self.n_speed_levels = n_speed_levels
+
+        self.state = None
+        self.score = 0
+        self.final_scores = []
+
+    @staticmethod
+    def create_progress_dialog():
+        return None
+
+    def change_state(self, new_state):
+        self.state = new_state
+
+    def update_leaderboard(self, score):
+        if score is not None:
+            self.final_scores.append(score)
+
+    def update_score(self, score):
+        self.score = score
@@ -0,0 +1,16 @@
+import sys
+import importlib
+from pathlib import Path
+
+# the addin is imported as package like in fusion, the tests run from the addin
+# folder with checked out submodules (python -m pytest) and import the package as
+# Snacade whatever the folder is named
+addin_folder = Path(__file__).parents[1]
+sys.path.insert(0, str(addin_folder.parent))
+sys.modules.setdefault("Snacade", importlib.import_module(addin_folder.name))
+
+# pylint:disable=wrong-import-position
+from Snacade.src.standin import install_adsk_standin
+
+# the game modules import the fusion api on module level
+install_adsk_standin()
@@ -0,0 +1,87 @@
+import random
+import itertools
+
+import pytest
+
+from Snacade.src.game import ReachabilityIndex
+
+
+def _neighbours(cell, shape, portals):
+    for d, size in enumerate(shape):
+        for offset in (-1, 1):
+            c = cell[d] + offset
+            if portals:
+                c %= size
+            elif not 0 <= c < size:
+                continue
+            neighbour = (*cell[:d], c, *cell[d + 1 :])
+            if neighbour != cell:
+                yield neighbour
+
+
+def _flood_fill(cell, free, shape, portals):
+    # all free cells which are connected to a free neighbour of the cell
+    stack = [n for n in _neighbours(cell, shape, portals) if n in free]
+    reached = set(stack)
+    while stack:
+        for n in _neighbours(stack.pop(), shape, portals):
+            if n in free and n not in reached:
+                reached.add(n)
+                stack.append(n)
+    return reached
+
+
+class _EnumeratingRandrange:
+    # replaces random.randrange to let the index draw a given member
+    def __init__(self):
+        self.k = 0
+        self.n = None
+
+    def __call__(self, n):
+        self.n = n
+        return self.k
+
+
+def _all_reachable(index, cell, randrange):
+    randrange.k = 0
+    randrange.n = None
+    first = index.random_reachable(cell)
+    if first is None:
+        return set()
+    reachable = {first}
+    n_reachable = randrange.n
+    for randrange.k in range(1, n_reachable):
+        reachable.add(index.random_reachable(cell))
+    assert len(reachable) == n_reachable
+    return reachable
+
+
+@pytest.mark.parametrize("shape", [(12, 9, 1), (6, 5, 4)])
+@pytest.mark.parametrize("portals", [False, True])
+def test_random_reachable_matches_flood_fill(shape, portals, monkeypatch):
+    rng = random.Random(0)
+    randrange = _EnumeratingRandrange()
+    monkeypatch.setattr(random, "randrange", randrange)
+
+    cells = list(itertools.product(*(range(size) for size in shape)))
+    blocked = set(rng.sample(cells, len(cells) // 4))
+    free = set(cells) - blocked
+    index = ReachabilityIndex(shape, blocked, portals)
+
+    for _ in range(1500):
+        cell = rng.choice(cells)
+        if cell in free:
+            index.remove(cell)
+            free.discard(cell)
+        else:
+            index.add(cell)
+            free.add(cell)
+
+        # queries are interleaved with the changes as dirty regions are only
+        # rebuilt when they are queried
+        if rng.random() < 0.2:
+            query = rng.choice(cells)
+            assert _all_reachable(index, query, randrange) == _flood_fill(
+                query, free, shape, portals
+            )
+            assert index.is_free(query) == (query in free)
@@ -0,0 +1,33 @@
+import pytest
+
+from Snacade.src.replay import replay
+
+# maximum number of body operations of a single tick when drawing the snake with
+# spheres: restyle the old head to a body cell, create the new head and delete the
+# tail, if the snake eats the tail is kept, the food cell is restyled to the head
+# and the new food is created
+SPHERES_BUDGET = 3
+# with the merged snake body: delete the old and create the new head, create a
+# sphere for the new body cell, delete and create the run next to the head at a
+# turn and delete and create the run at the tail end (or delete and create the
+# food instead if the snake grows)
+MERGED_BUDGET = 7
+
+
+def _max_body_operations(stats):
+    # the first frame is the initial build of the world
+    return max(stats.body_operations(frame) for frame in stats.frames[1:])
+
+
+@pytest.mark.parametrize("world_name", ["standard", "frame", "cube"])
+def test_spheres_body_operations_budget(world_name):
+    game, stats = replay(world_name, 500, seed=0)
+    assert game.score > 0
+    assert _max_body_operations(stats) <= SPHERES_BUDGET
+
+
+@pytest.mark.parametrize("world_name", ["standard", "cube"])
+def test_merged_body_operations_budget(world_name):
+    game, stats = replay(world_name, 1500, seed=0, merged_snake=True)
+    assert game.score > 0
+    assert _max_body_operations(stats) <= MERGED_BUDGET
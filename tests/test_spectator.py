@@ -0,0 +1,105 @@
+import socket
+import random
+
+from Snacade.src.game import Game
+from Snacade.src.replay import autopilot
+from Snacade.src.standin import RecordingWorld, StandinGameUI
+from Snacade.src.spectator import (
+    SpectatorPublisher,
+    SpectatorView,
+    EVENT_ATE,
+    EVENT_OVER,
+    EVENT_RESET,
+)
+
+OPPOSITES = {"left": "right", "right": "left", "up": "down", "down": "up"}
+
+
+def _sync(sock, view, frame):
+    # feeds the view until it has received the given frame
+    while (view.epoch, view.moves, view.state) != (
+        frame.epoch,
+        frame.moves,
+        frame.state,
+    ):
+        data = sock.recv(1 << 16)
+        assert data
+        view.feed(data)
+
+    assert list(view.snake) == list(frame.snake)
+    assert view.food == frame.food
+    assert view.score == frame.score
+    assert view.shape == frame.shape
+    assert view.maze == set(frame.maze)
+    assert view.portal == set(frame.portal)
+
+
+def _move(sock, view, game):
+    old_score = game.score
+    game.move_snake()
+    _sync(sock, view, game.frame)
+    if game.state == "over":
+        assert view.events & EVENT_OVER
+    elif game.score > old_score:
+        assert view.events == EVENT_ATE
+    else:
+        assert view.events == 0
+
+
+def test_view_rebuilds_the_published_frames():
+    random.seed(0)
+    publisher = SpectatorPublisher(("127.0.0.1", 0))
+    publisher.start()
+    try:
+        game = Game(
+            RecordingWorld(1),
+            StandinGameUI("standard", 0, 5),
+            None,
+            0.1,
+            0.5,
+            spectator=publisher,
+        )
+        sock = socket.create_connection(publisher.address, timeout=5)
+        view = SpectatorView()
+
+        # the first message is a keyframe of the start state
+        _sync(sock, view, game.frame)
+        assert view.state == "start"
+        assert view.events & EVENT_RESET
+
+        game.play()
+        _sync(sock, view, game.frame)
+        while game.score < 3:
+            autopilot(game)
+            _move(sock, view, game)
+
+        # a u-turn runs into the body
+        direction = game.snake.direction
+        turn = "up" if direction in ("left", "right") else "left"
+        for new_direction in (turn, OPPOSITES[direction], OPPOSITES[turn]):
+            getattr(game, new_direction)()
+        for _ in range(3):
+            _move(sock, view, game)
+        assert view.state == "over"
+
+        epoch = game.frame.epoch
+        game.reset()
+        _sync(sock, view, game.frame)
+        assert view.epoch != epoch
+        assert view.state == "start"
+        assert view.events & EVENT_RESET
+
+        game.play()
+        for _ in range(10):
+            _move(sock, view, game)
+
+        # moves in quick succession can be coalesced into a delta of several cells
+        for _ in range(5):
+            autopilot(game)
+            game.move_snake()
+        _sync(sock, view, game.frame)
+
+        sock.close()
+        game.stop()
+    finally:
+        publisher.stop()